@@ -5,12 +5,13 @@
  * Sessions survive browser disconnects and can be resumed from any device.
  */
 
-const { exec, spawn } = require('child_process');
+const { exec, execFile, spawn } = require('child_process');
 const { promisify } = require('util');
 const crypto = require('crypto');
 const path = require('path');
 
 const execAsync = promisify(exec);
+const execFileAsync = promisify(execFile);
 
 /**
  * Run tmux command via spawn (bypasses shell, safe for special chars)
@@ -199,6 +200,20 @@ async function killSession(id) {
   await execAsync(`tmux kill-session -t "${name}" 2>/dev/null || true`);
 }
 
+/**
+ * Capture the visible text of a session's pane
+ * @param {string} id - Session ID
+ * @returns {Promise<string>}
+ */
+async function capturePane(id) {
+  const name = `${SESSION_PREFIX}${id}`;
+  const { stdout } = await execFileAsync('tmux', ['capture-pane', '-t', name, '-p'], {
+    encoding: 'utf-8',
+    timeout: 5000
+  });
+  return stdout;
+}
+
 /**
  * Check if a session is alive
  * @param {string} id - Session ID
@@ -221,5 +236,6 @@ module.exports = {
   sendInterrupt,
   sendKeys,
   killSession,
+  capturePane,
   isSessionAlive
 };
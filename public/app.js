@@ -281,7 +281,7 @@ async function loadSessions() {
     const sessions = await fetchSessions();
 
     if (sessions.length === 0) {
-      elements.sessionsList.innerHTML = '<p class="loading">No sessions yet</p>';
+      elements.sessionsList.innerHTML = '<p class="loading empty-state">No sessions yet</p>';
       return;
     }
 
@@ -303,12 +303,13 @@ async function loadSessions() {
     });
   } catch (err) {
     console.error('Error loading sessions:', err);
-    elements.sessionsList.innerHTML = '<p class="loading">Error loading sessions</p>';
+    elements.sessionsList.innerHTML = '<p class="loading error-state">Error loading sessions</p>';
   }
 }
 
 async function loadSessionContent(sessionId) {
   elements.messagesContainer.innerHTML = '<p class="loading">Loading conversation...</p>';
+  delete elements.messagesContainer.dataset.loadedSession;
   state.messages = [];
   state.answeredQuestions.clear(); // Reset for new session
 
@@ -366,6 +367,9 @@ async function loadSessionContent(sessionId) {
   } catch (err) {
     console.error('Error loading session:', err);
     elements.messagesContainer.innerHTML = '<p class="loading">Error loading conversation</p>';
+  } finally {
+    // Readiness marker for scripts: set once the conversation has rendered (or failed)
+    elements.messagesContainer.dataset.loadedSession = sessionId;
   }
 }
 
@@ -432,7 +436,7 @@ function renderMessage(msg) {
             const planId = `plan-${block.id}`;
             const answeredClass = state.answeredQuestions.has(planId) ? ' answered' : '';
             return `
-              <div class="exit-plan-mode${answeredClass}" data-plan-id="${planId}">
+              <div class="exit-plan-mode${answeredClass}" data-plan-id="${planId}" data-testid="${planId}">
                 <div class="plan-header">Implementation Plan</div>
                 <div class="plan-content">${renderMarkdown(block.input?.plan || '')}</div>
                 <div class="plan-actions">
@@ -450,7 +454,7 @@ function renderMessage(msg) {
               if (q.multiSelect) {
                 // MultiSelect: toggle buttons with submit
                 return `
-                  <div class="ask-user-question${answeredClass}" data-question-id="${questionId}" data-multi-select="true">
+                  <div class="ask-user-question${answeredClass}" data-question-id="${questionId}" data-testid="${questionId}" data-multi-select="true">
                     <div class="question-header">${escapeHtml(q.header || 'Question')}</div>
                     <div class="question-text">${escapeHtml(q.question)}</div>
                     <div class="question-options multi-select">
@@ -467,7 +471,7 @@ function renderMessage(msg) {
               } else {
                 // Single select: immediate send
                 return `
-                  <div class="ask-user-question${answeredClass}" data-question-id="${questionId}">
+                  <div class="ask-user-question${answeredClass}" data-question-id="${questionId}" data-testid="${questionId}">
                     <div class="question-header">${escapeHtml(q.header || 'Question')}</div>
                     <div class="question-text">${escapeHtml(q.question)}</div>
                     <div class="question-options">
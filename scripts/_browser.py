@@ -0,0 +1,99 @@
+"""
+Shared browser setup for the Claude Go scripts.
+
+Either launches a private headless Chromium, or attaches to one that is
+already running (see serve-browser.py) so repeat invocations skip startup.
+A running serve-browser.py advertises itself in ENDPOINT_FILE, so scripts
+pick it up without --cdp-endpoint.
+"""
+from pathlib import Path
+from playwright.sync_api import Error as PlaywrightError
+
+# Page-side getters (window.__claudeGo), read once at import
+GETTERS_JS = (Path(__file__).parent / 'getters.js').read_text()
+
+# Written by serve-browser.py while it runs
+ENDPOINT_FILE = Path('/tmp/claude-go-browser.endpoint')
+
+# Headless test runs need none of these; the throttling ones also matter
+# because parallel contexts would otherwise count as background pages
+LAUNCH_ARGS = [
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-features=TranslateUI,MediaRouter',
+    '--disable-extensions',
+    '--disable-background-networking',
+]
+
+
+def launch(p, extra_args=()):
+    """Launch headless Chromium with the trimmed flag set."""
+    return p.chromium.launch(headless=True, args=LAUNCH_ARGS + list(extra_args),
+                             ignore_default_args=['--enable-automation'])
+
+
+def shared_endpoint():
+    """CDP endpoint of a running serve-browser.py, or None."""
+    try:
+        return ENDPOINT_FILE.read_text().strip() or None
+    except OSError:
+        return None
+
+
+def open_browser(p, cdp_endpoint=None):
+    """Attach to a running browser if one is available, else launch headless."""
+    if cdp_endpoint:
+        return p.chromium.connect_over_cdp(cdp_endpoint)
+
+    shared = shared_endpoint()
+    if shared:
+        try:
+            return p.chromium.connect_over_cdp(shared)
+        except PlaywrightError:
+            pass  # Stale endpoint file; launch our own
+
+    return launch(p)
+
+
+def open_page(p, cdp_endpoint=None):
+    """Return (browser, page), reusing a running browser if one is available."""
+    browser = open_browser(p, cdp_endpoint)
+    # An attached browser has its default context; a launched one has none
+    context = browser.contexts[0] if browser.contexts else None
+    return browser, (context.new_page() if context else browser.new_page())
+
+
+def install_getters(page):
+    """Register window.__claudeGo on every document the page loads."""
+    page.add_init_script(script=GETTERS_JS)
+
+
+def close_page(browser, page):
+    """Close our page and release the browser (disconnect only, if shared)."""
+    page.close()
+    browser.close()
+
+
+async def open_browser_async(p, cdp_endpoint=None, extra_args=()):
+    """Async counterpart of open_browser. extra_args only apply if it has to launch."""
+    if cdp_endpoint:
+        return await p.chromium.connect_over_cdp(cdp_endpoint)
+
+    shared = shared_endpoint()
+    if shared:
+        try:
+            return await p.chromium.connect_over_cdp(shared)
+        except PlaywrightError:
+            pass  # Stale endpoint file; launch our own
+
+    return await launch(p, extra_args)
+
+
+async def open_context_async(p, cdp_endpoint=None):
+    """Async counterpart of open_page, returning (browser, context) for multi-tab use."""
+    browser = await open_browser_async(p, cdp_endpoint)
+    context = browser.contexts[0] if browser.contexts else await browser.new_context()
+    return browser, context
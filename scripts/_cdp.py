@@ -0,0 +1,77 @@
+"""
+Minimal Chrome DevTools Protocol client for the hot Explorer calls.
+
+Talks straight to a page target over its DevTools WebSocket, skipping the
+Playwright driver for evaluate/click round-trips. Needs the `websockets`
+package and a browser started with a remote debugging port (serve-browser.py).
+"""
+import json
+from urllib.parse import urlparse
+from websockets.sync.client import connect
+
+
+class CDPError(RuntimeError):
+    pass
+
+
+class CDPClient:
+    def __init__(self, ws_url):
+        # Large pages can return big evaluate results; don't cap frame size
+        self.ws = connect(ws_url, max_size=None)
+        self._next_id = 0
+
+    @classmethod
+    def for_page(cls, page, cdp_endpoint):
+        """Attach to the target behind a Playwright page on a shared browser."""
+        session = page.context.new_cdp_session(page)
+        target_id = session.send('Target.getTargetInfo')['targetInfo']['targetId']
+        session.detach()
+        host = urlparse(cdp_endpoint).netloc
+        return cls(f"ws://{host}/devtools/page/{target_id}")
+
+    def close(self):
+        self.ws.close()
+
+    def send(self, method, **params):
+        """Send one command and return its result, skipping unrelated events."""
+        self._next_id += 1
+        msg_id = self._next_id
+        self.ws.send(json.dumps({'id': msg_id, 'method': method, 'params': params}))
+        while True:
+            msg = json.loads(self.ws.recv())
+            if msg.get('id') != msg_id:
+                continue
+            if 'error' in msg:
+                raise CDPError(f"{method}: {msg['error'].get('message')}")
+            return msg['result']
+
+    def evaluate(self, js, arg=None):
+        """Call a JS function expression in the page and return its value."""
+        expression = f"({js})({json.dumps(arg)})"
+        result = self.send('Runtime.evaluate', expression=expression,
+                           returnByValue=True, awaitPromise=True)
+        if 'exceptionDetails' in result:
+            raise CDPError(result['exceptionDetails'].get('text', 'evaluate failed'))
+        return result['result'].get('value')
+
+    def click(self, finder, arg=None):
+        """Click the element a JS finder function returns. False if it returns null."""
+        expression = f"({finder})({json.dumps(arg)})"
+        obj = self.send('Runtime.evaluate', expression=expression)['result']
+        object_id = obj.get('objectId')
+        if object_id is None:
+            return False
+
+        try:
+            self.send('DOM.scrollIntoViewIfNeeded', objectId=object_id)
+            quad = self.send('DOM.getBoxModel', objectId=object_id)['model']['content']
+        finally:
+            self.send('Runtime.releaseObject', objectId=object_id)
+        x = sum(quad[0::2]) / 4
+        y = sum(quad[1::2]) / 4
+
+        self.send('Input.dispatchMouseEvent', type='mouseMoved', x=x, y=y)
+        for event in ('mousePressed', 'mouseReleased'):
+            self.send('Input.dispatchMouseEvent', type=event, x=x, y=y,
+                      button='left', clickCount=1)
+        return True
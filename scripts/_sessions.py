@@ -0,0 +1,63 @@
+"""
+Session-list helpers shared by the Claude Go scripts.
+
+One copy of the selectors and __claudeGo calls (see getters.js), plus the
+"load the picker, click into a session" sequence.
+"""
+BASE_URL = "http://127.0.0.1:7682"
+# Observer sockets never take the device lease from a browser tab
+WS_URL = "ws://127.0.0.1:7682/ws/{}?observer=1"
+
+# Session list has rendered (cards, the empty placeholder, or the fetch error),
+# so a failed /api/sessions ends the wait instead of running out its timeout
+SESSIONS_READY = '.session-card, .empty-state, .error-state'
+
+# Ids go in as evaluate arguments, never into selector strings
+JS_FIND_CARD = 'id => __claudeGo.findCard(id)'
+JS_SESSION_LOADED = 'id => __claudeGo.sessionLoaded(id)'
+JS_LIST_SESSIONS = '() => __claudeGo.listSessions()'
+JS_GET_STATE = '() => __claudeGo.getState()'
+JS_INSPECT_MESSAGES = '() => __claudeGo.inspectMessages()'
+
+
+def goto_sessions(page):
+    """Load the session picker and wait for it to render.
+
+    goto returns as soon as the response starts; the SESSIONS_READY wait is
+    the only readiness gate, since cards render after app.js has run anyway.
+    """
+    page.goto(BASE_URL, wait_until='commit')
+    page.locator(SESSIONS_READY).first.wait_for(timeout=5000)
+
+
+async def goto_sessions_async(page):
+    """Async counterpart of goto_sessions."""
+    await page.goto(BASE_URL, wait_until='commit')
+    await page.locator(SESSIONS_READY).first.wait_for(timeout=5000)
+
+
+def list_sessions(page):
+    """Session cards on the picker as [{id, name, preview, alive}]."""
+    return page.evaluate(JS_LIST_SESSIONS)
+
+
+def open_session(page, session_id):
+    """Click into a session (full id or prefix). Returns False if no card matches."""
+    card = page.evaluate_handle(JS_FIND_CARD, session_id).as_element()
+    if card is None:
+        return False
+
+    card.click()
+    page.wait_for_function(JS_SESSION_LOADED, arg=session_id, timeout=5000)
+    return True
+
+
+async def open_session_async(page, session_id):
+    """Async counterpart of open_session."""
+    card = (await page.evaluate_handle(JS_FIND_CARD, session_id)).as_element()
+    if card is None:
+        return False
+
+    await card.click()
+    await page.wait_for_function(JS_SESSION_LOADED, arg=session_id, timeout=5000)
+    return True
@@ -8,9 +8,11 @@ and observe UI behavior.
 Usage:
     python scripts/explore.py              # Interactive REPL
     python scripts/explore.py --session <id>
+    python scripts/explore.py --cdp-endpoint <ws-url> --raw-cdp   # Hot calls over raw CDP
 
 Commands:
-    state, s         - Show current session state
+    state, s         - Show current session state (cached until the page changes)
+    state!, s!       - Re-read state from the page regardless of cache
     msg, m <text>    - Send a message
     answer, a <n>    - Answer current question with option n
     multi, x <n,m>   - Multi-select answer (comma-separated)
@@ -25,105 +27,142 @@ import time
 import json
 import argparse
 import requests
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from _browser import open_page, close_page, install_getters, shared_endpoint
+from _sessions import BASE_URL, JS_GET_STATE, goto_sessions, open_session
 
-BASE_URL = "http://127.0.0.1:7682"
+# Element finders for the action verbs (ids passed as arguments, see getters.js)
+JS_QUESTION_OPTION = '([id, nth]) => __claudeGo.findQuestion(id)?.querySelectorAll(".question-option")[nth] ?? null'
+JS_PLAN_BUTTON = '([id, action]) => __claudeGo.findPlan(id)?.querySelector(`[data-action="${action}"]`) ?? null'
+JS_QUESTION_ANSWERED = 'id => __claudeGo.findQuestion(id)?.classList.contains("answered")'
+JS_PLAN_ANSWERED = 'id => __claudeGo.findPlan(id)?.classList.contains("answered")'
+JS_MESSAGE_COUNT = "() => document.querySelectorAll('.message').length"
+JS_DOM_VERSION = '() => __claudeGo.version'
+
+# One keep-alive connection for the REPL's REST calls, not a new one per command
+HTTP = requests.Session()
 
 class Explorer:
-    def __init__(self, session_id=None):
+    def __init__(self, session_id=None, cdp_endpoint=None, raw_cdp=False):
         self.session_id = session_id
+        self.cdp_endpoint = cdp_endpoint
+        self.raw_cdp = raw_cdp
         self.page = None
         self.browser = None
         self.pw = None
+        self.cdp = None
+        self._loc_cache = {}
+        self._app_ws = None
+        self._cached_state = None
 
     def start(self):
-        print("Starting Playwright browser...")
-        self.pw = sync_playwright().start()
-        self.browser = self.pw.chromium.launch(headless=True)
-        self.page = self.browser.new_page()
-        self.page.goto(BASE_URL)
-        self.page.wait_for_load_state('networkidle')
-        self.page.wait_for_timeout(500)
-
+        """Connect to the backend only; the browser waits for the first UI command."""
+        # The backend already knows the sessions; no need to render cards to pick one
         if not self.session_id:
             self.session_id = self._find_alive_session()
 
-        if self.session_id:
-            self._open_session(self.session_id)
-            print(f"Connected to session: {self.session_id[:12]}...")
-        else:
+        if not self.session_id:
             print("No sessions found!")
+            return
+
+        print(f"Using session: {self.session_id[:12]}...")
+
+    def _ensure_browser(self):
+        """Launch (or attach to) the browser and open our session, once."""
+        if self.page:
+            return
+
+        print("Starting Playwright browser...")
+        self.pw = sync_playwright().start()
+        self.browser, self.page = open_page(self.pw, self.cdp_endpoint)
+        install_getters(self.page)
+        self.page.on('websocket', self._on_websocket)
+        goto_sessions(self.page)
+        self._open_session()
+
+        if self.raw_cdp:
+            # Playwright stays in charge of navigation; evaluate/click go direct
+            from _cdp import CDPClient
+            self.cdp = CDPClient.for_page(self.page, self.cdp_endpoint)
+            print("Hot calls via raw CDP")
+
+    def _open_session(self):
+        """Click into our session from the picker; every later command reads that page."""
+        if not open_session(self.page, self.session_id):
+            raise RuntimeError(f"Session {self.session_id[:12]} not on the picker")
 
     def stop(self):
+        if self.cdp:
+            self.cdp.close()
         if self.browser:
-            self.browser.close()
+            close_page(self.browser, self.page)
         if self.pw:
             self.pw.stop()
 
+    def _on_websocket(self, ws):
+        """Track the app's session socket (it reconnects on drops)."""
+        if '/ws/' in ws.url:
+            self._app_ws = ws
+
+    def _locator(self, selector):
+        """Get a memoized Locator for a static selector."""
+        loc = self._loc_cache.get(selector)
+        if loc is None:
+            loc = self._loc_cache[selector] = self.page.locator(selector)
+        return loc
+
+    def _evaluate(self, js, arg=None):
+        """Run a JS function in the page, over raw CDP when enabled."""
+        if self.cdp:
+            return self.cdp.evaluate(js, arg)
+        return self.page.evaluate(js, arg)
+
+    def _click(self, finder, arg):
+        """Click the element a finder function returns. False if there is none."""
+        if self.cdp:
+            return self.cdp.click(finder, arg)
+        el = self.page.evaluate_handle(finder, arg).as_element()
+        if el is None:
+            return False
+        el.click()
+        return True
+
+    def _list_sessions_via_api(self):
+        resp = HTTP.get(f"{BASE_URL}/api/sessions", timeout=5)
+        resp.raise_for_status()
+        return resp.json()
+
     def _find_alive_session(self):
-        sessions = self.page.evaluate('''() => {
-            return Array.from(document.querySelectorAll('.session-card')).map(el => ({
-                id: el.dataset.id,
-                alive: el.querySelector('.status-dot')?.classList.contains('alive')
-            }));
-        }''')
+        try:
+            sessions = self._list_sessions_via_api()
+        except requests.RequestException as e:
+            print(f"Couldn't list sessions: {e}")
+            return None
         alive = [s for s in sessions if s['alive']]
         return alive[0]['id'] if alive else (sessions[0]['id'] if sessions else None)
 
-    def _open_session(self, session_id):
-        card = self.page.locator(f'.session-card[data-id="{session_id}"]')
-        if card.count() == 0:
-            card = self.page.locator(f'.session-card[data-id^="{session_id}"]')
-        if card.count() > 0:
-            card.click()
-            self.page.wait_for_timeout(1500)
-
-    def get_state(self):
-        """Get current UI state."""
-        return self.page.evaluate('''() => {
-            const state = {
-                messages: [],
-                pendingQuestions: [],
-                pendingPlans: [],
-                inputValue: document.querySelector('#message-input')?.value || ''
-            };
+    def get_state(self, force=False):
+        """Get current UI state, reusing the last scan while the page's DOM is unchanged.
 
-            document.querySelectorAll('.message').forEach((el, i) => {
-                const msg = {
-                    idx: i,
-                    type: el.classList.contains('user') ? 'user' : 'assistant',
-                    pending: el.classList.contains('pending'),
-                    preview: el.textContent?.substring(0, 60).trim().replace(/\\s+/g, ' ')
-                };
-                state.messages.push(msg);
-            });
-
-            document.querySelectorAll('.ask-user-question:not(.answered)').forEach(q => {
-                const options = Array.from(q.querySelectorAll('.question-option')).map(
-                    (o, i) => `${i+1}. ${o.textContent.trim().substring(0, 40)}`
-                );
-                state.pendingQuestions.push({
-                    id: q.dataset.questionId,
-                    header: q.querySelector('.question-header')?.textContent,
-                    question: q.querySelector('.question-text')?.textContent?.substring(0, 60),
-                    options,
-                    multiSelect: q.classList.contains('multi-select')
-                });
-            });
-
-            document.querySelectorAll('.exit-plan-mode:not(.answered)').forEach(p => {
-                state.pendingPlans.push({
-                    id: p.dataset.planId,
-                    preview: p.textContent?.substring(0, 100).trim()
-                });
-            });
-
-            return state;
-        }''')
+        A cache hit still costs one evaluate round trip (reading the page's
+        mutation counter, see getters.js); what it saves is the scan and its
+        serialization.
+        """
+        self._ensure_browser()
+        if not force and self._cached_state is not None \
+                and self._evaluate(JS_DOM_VERSION) == self._cached_state['version']:
+            return self._cached_state
 
-    def print_state(self):
+        self._cached_state = self._evaluate(JS_GET_STATE)
+        return self._cached_state
+
+    def _invalidate_state(self):
+        """Drop the cached state after we've acted on the page."""
+        self._cached_state = None
+
+    def print_state(self, force=False):
         """Pretty print current state."""
-        state = self.get_state()
+        state = self.get_state(force)
 
         print(f"\n{'='*60}")
         print(f"Messages: {len(state['messages'])} total")
@@ -155,78 +194,146 @@ class Explorer:
 
     def send_message(self, text):
         """Send a message to Claude."""
+        self._ensure_browser()
         print(f"Sending: {text[:50]}...")
-        self.page.locator('#message-input').fill(text)
-        self.page.locator('#send-btn').click()
-        self.page.wait_for_timeout(500)
+        self._invalidate_state()
+        self._locator('#message-input').fill(text)
+        if self._app_ws:
+            # Input goes out over the app's WebSocket; wait for that frame
+            try:
+                with self._app_ws.expect_event(
+                    'framesent', lambda payload: '"type":"input"' in payload, timeout=5000
+                ):
+                    self._locator('#send-btn').click()
+            except PlaywrightTimeoutError:
+                print("Input never left the page (WebSocket down?)")
+                return
+        else:
+            self._locator('#send-btn').click()
+
+        if text.startswith('/'):
+            # Slash commands are terminal-local; no optimistic message to watch
+            print("Sent.")
+            return
+
+        # The optimistic message is already up; it clears once the JSONL confirms it
         print("Sent. Waiting for response...")
-        # Wait a bit for response to start
-        self.page.wait_for_timeout(2000)
+        try:
+            self.page.wait_for_selector('.message.pending', state='detached', timeout=10000)
+        except PlaywrightTimeoutError:
+            print("Still pending. Check state with 's'")
+
+    def _first_pending_question(self):
+        """Get the first unanswered question without a full state scan."""
+        return self._evaluate('''() => {
+            const q = document.querySelector('.ask-user-question:not(.answered)');
+            if (!q) return null;
+            return {
+                id: q.dataset.questionId,
+                header: q.querySelector('.question-header')?.textContent,
+                multiSelect: q.dataset.multiSelect === 'true'
+            };
+        }''')
+
+    def _first_pending_plan_id(self):
+        """Get the first unanswered plan id without a full state scan."""
+        return self._evaluate(
+            "() => document.querySelector('.exit-plan-mode:not(.answered)')?.dataset.planId ?? null"
+        )
 
     def answer_question(self, option_num):
         """Answer current question with option number (1-indexed)."""
-        state = self.get_state()
-        if not state['pendingQuestions']:
+        self._ensure_browser()
+        q = self._first_pending_question()
+        if not q:
             print("No pending questions!")
             return
 
-        q = state['pendingQuestions'][0]
         print(f"Answering '{q['header']}' with option {option_num}")
 
         # Click the option (0-indexed in DOM)
-        self.page.locator(f'[data-question-id="{q["id"]}"] .question-option').nth(option_num - 1).click()
-        self.page.wait_for_timeout(600)
-        print("Answered. Check state with 's'")
+        self._invalidate_state()
+        if not self._click(JS_QUESTION_OPTION, [q['id'], option_num - 1]):
+            print(f"No option {option_num}")
+            return
+        if self._wait_answered(JS_QUESTION_ANSWERED, q['id']):
+            print("Answered. Check state with 's'")
 
     def answer_multi(self, options_str):
         """Answer multi-select with comma-separated options."""
-        state = self.get_state()
-        if not state['pendingQuestions']:
+        self._ensure_browser()
+        q = self._first_pending_question()
+        if not q:
             print("No pending questions!")
             return
 
-        q = state['pendingQuestions'][0]
-        if not q.get('multiSelect'):
+        if not q['multiSelect']:
             print("Warning: This question is not multi-select")
 
         options = [int(x.strip()) for x in options_str.split(',')]
         print(f"Selecting options: {options} for '{q['header']}'")
 
-        for opt in options:
-            self.page.locator(f'[data-question-id="{q["id"]}"] .question-option').nth(opt - 1).click()
-            self.page.wait_for_timeout(200)
+        self._invalidate_state()
+        # Dispatch every click in one page round-trip; el.click() runs the handlers
+        # synchronously, so the returned count confirms the selections landed
+        clicked = self._evaluate('''({qid, idxs}) => {
+            const q = __claudeGo.findQuestion(qid);
+            if (!q) return null;
+            const opts = q.querySelectorAll('.question-option');
+            let n = 0;
+            for (const i of idxs) {
+                if (opts[i-1]) { opts[i-1].click(); n++; }
+            }
+            return n;
+        }''', {'qid': q['id'], 'idxs': options})
+        if clicked is None:
+            # Answered or re-rendered since we looked it up
+            print("Question not found. Check state with 's'")
+            return
+        if clicked != len(options):
+            print(f"Warning: only {clicked} of {len(options)} options exist")
 
         # Now submit (might need Tab+Enter equivalent)
-        # For now just wait
-        self.page.wait_for_timeout(600)
         print("Selections made. Check state with 's'")
 
     def approve_plan(self):
         """Approve pending ExitPlanMode."""
-        state = self.get_state()
-        if not state['pendingPlans']:
+        self._ensure_browser()
+        plan_id = self._first_pending_plan_id()
+        if not plan_id:
             print("No pending plans!")
             return
 
-        p = state['pendingPlans'][0]
-        print(f"Approving plan: {p['id']}")
-        self.page.locator(f'[data-plan-id="{p["id"]}"] [data-action="approve-plan"]').click()
-        self.page.wait_for_timeout(600)
+        print(f"Approving plan: {plan_id}")
+        self._invalidate_state()
+        if self._click(JS_PLAN_BUTTON, [plan_id, 'approve-plan']):
+            self._wait_answered(JS_PLAN_ANSWERED, plan_id)
 
     def reject_plan(self):
         """Reject pending ExitPlanMode."""
-        state = self.get_state()
-        if not state['pendingPlans']:
+        self._ensure_browser()
+        plan_id = self._first_pending_plan_id()
+        if not plan_id:
             print("No pending plans!")
             return
 
-        p = state['pendingPlans'][0]
-        print(f"Rejecting plan: {p['id']}")
-        self.page.locator(f'[data-plan-id="{p["id"]}"] [data-action="reject-plan"]').click()
-        self.page.wait_for_timeout(600)
+        print(f"Rejecting plan: {plan_id}")
+        self._invalidate_state()
+        if self._click(JS_PLAN_BUTTON, [plan_id, 'reject-plan']):
+            self._wait_answered(JS_PLAN_ANSWERED, plan_id)
+
+    def _wait_answered(self, check, card_id, timeout=5000):
+        """Wait for an inline card to pick up the .answered class."""
+        try:
+            self.page.wait_for_function(check, arg=card_id, timeout=timeout)
+            return True
+        except PlaywrightTimeoutError:
+            print("Not marked answered yet. Check state with 's'")
+            return False
 
     def screenshot(self):
         """Take a screenshot."""
+        self._ensure_browser()
         path = f"/tmp/claude-go-explore-{int(time.time())}.png"
         self.page.screenshot(path=path, full_page=True)
         print(f"Screenshot: {path}")
@@ -248,15 +355,27 @@ class Explorer:
                 "content": content if isinstance(content, list) else [content]
             }]
         }
-        resp = requests.post(f"{BASE_URL}/dev/inject/{self.session_id}", json=payload)
-        self.page.wait_for_timeout(500)
+        # The server only broadcasts to open pages (404 with none), so open ours first
+        self._ensure_browser()
+        before = self._evaluate(JS_MESSAGE_COUNT)
+        resp = HTTP.post(f"{BASE_URL}/dev/inject/{self.session_id}", json=payload)
+        if not resp.ok:
+            print(f"Inject failed ({resp.status_code}): {resp.text}")
+            return
+        try:
+            self.page.wait_for_function(
+                f"n => ({JS_MESSAGE_COUNT})() > n", arg=before, timeout=5000
+            )
+        except PlaywrightTimeoutError:
+            print("Injected message hasn't rendered yet")
+        self._invalidate_state()
         print(f"Injected: {resp.json()}")
 
     def run_repl(self):
         """Run interactive REPL."""
         print(__doc__)
         print(f"\nSession: {self.session_id[:12]}...")
-        self.print_state()
+        print("(Browser starts on the first command that needs the page)")
 
         while True:
             try:
@@ -275,6 +394,8 @@ class Explorer:
                 break
             elif verb in ('s', 'state'):
                 self.print_state()
+            elif verb in ('s!', 'state!'):
+                self.print_state(force=True)
             elif verb in ('m', 'msg'):
                 if arg:
                     self.send_message(arg)
@@ -302,28 +423,44 @@ class Explorer:
                 else:
                     print("Usage: inject <json>")
             elif verb == 'refresh':
-                self.page.reload()
-                self.page.wait_for_timeout(1000)
+                self._ensure_browser()
+                # Reload lands on the session list; go back into our session
+                goto_sessions(self.page)
+                self._loc_cache.clear()
+                self._invalidate_state()
+                self._open_session()
                 print("Refreshed")
             elif verb == 'wait':
                 secs = int(arg) if arg else 3
                 print(f"Waiting {secs}s...")
-                self.page.wait_for_timeout(secs * 1000)
+                if self.page:
+                    self.page.wait_for_timeout(secs * 1000)
+                else:
+                    time.sleep(secs)
             else:
                 print(f"Unknown command: {verb}")
-                print("Commands: s, m, a, x, py, pn, ss, inject, refresh, wait, q")
+                print("Commands: s, s!, m, a, x, py, pn, ss, inject, refresh, wait, q")
 
 
 def main():
     parser = argparse.ArgumentParser(description='Claude Go Explorer')
     parser.add_argument('--session', help='Session ID to use')
+    parser.add_argument('--cdp-endpoint', help='Attach to a running browser instead of launching one')
+    parser.add_argument('--raw-cdp', action='store_true',
+                        help='Send evaluate/click straight over CDP (needs --cdp-endpoint)')
     args = parser.parse_args()
+    if args.raw_cdp and not args.cdp_endpoint:
+        args.cdp_endpoint = shared_endpoint()
+    if args.raw_cdp and not args.cdp_endpoint:
+        parser.error('--raw-cdp needs --cdp-endpoint (start one with serve-browser.py)')
 
-    explorer = Explorer(args.session)
+    explorer = Explorer(args.session, args.cdp_endpoint, args.raw_cdp)
     try:
         explorer.start()
         if explorer.session_id:
             explorer.run_repl()
+    except RuntimeError as e:
+        print(e)
     finally:
         explorer.stop()
         print("\nBye!")
@@ -0,0 +1,172 @@
+/**
+ * Page-side getters for the Claude Go scripts.
+ *
+ * Installed once per page via add_init_script so each poll is a short
+ * `__claudeGo.getState()` call instead of re-shipping and recompiling the
+ * whole extractor. Wrapped so a second copy in the same page (two scripts
+ * sharing one context) is a no-op rather than a redeclaration error.
+ */
+(() => {
+  if (window.__claudeGo) return;
+
+  /**
+   * First n characters of el's text, same as textContent.substring(0, n)
+   * but without building the whole subtree's string for long messages.
+   */
+  function textPrefix(el, n) {
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    let text = '';
+    while (text.length < n) {
+      const node = walker.nextNode();
+      if (!node) break;
+      text += node.nodeValue;
+    }
+    return text.substring(0, n);
+  }
+
+  // Bumped by every DOM change, so a caller can tell the page hasn't changed
+  // without rescanning it. Starts from the load time rather than 0, so a new
+  // document never repeats a count cached from the last one.
+  let domVersion = Date.now();
+  const domObserver = new MutationObserver(() => { domVersion++; });
+  // The document node itself, since init scripts run before <html> exists
+  domObserver.observe(document, {
+    subtree: true, childList: true, attributes: true, characterData: true
+  });
+
+  window.__claudeGo = {
+    /** Changes whenever the DOM does, including mutations not yet delivered. */
+    get version() {
+      if (domObserver.takeRecords().length) domVersion++;
+      return domVersion;
+    },
+
+    /** Current UI state for explore.py's REPL, stamped with the version it was read at. */
+    getState() {
+      const state = {
+        version: this.version,
+        messages: [],
+        pendingQuestions: [],
+        pendingPlans: [],
+        inputValue: document.querySelector('#message-input')?.value || ''
+      };
+
+      // One pass over everything we report on, dispatched by class
+      const nodes = document.querySelectorAll(
+        '.message, .ask-user-question:not(.answered), .exit-plan-mode:not(.answered)'
+      );
+      for (const el of nodes) {
+        const cls = el.classList;
+        if (cls.contains('message')) {
+          state.messages.push({
+            idx: state.messages.length,
+            type: cls.contains('user') ? 'user' : 'assistant',
+            pending: cls.contains('pending'),
+            preview: textPrefix(el, 60).trim().replace(/\s+/g, ' ')
+          });
+        } else if (cls.contains('ask-user-question')) {
+          let header, question, multiSelect = false;
+          const options = [];
+          for (const child of el.children) {
+            const c = child.classList;
+            if (c.contains('question-header')) {
+              header = child.textContent;
+            } else if (c.contains('question-text')) {
+              question = textPrefix(child, 60);
+            } else if (c.contains('question-options')) {
+              multiSelect = c.contains('multi-select');
+              for (const o of child.children) {
+                options.push(`${options.length + 1}. ${o.textContent.trim().substring(0, 40)}`);
+              }
+            }
+          }
+          state.pendingQuestions.push({
+            id: el.dataset.questionId,
+            header,
+            question,
+            options,
+            multiSelect
+          });
+        } else {
+          state.pendingPlans.push({
+            id: el.dataset.planId,
+            preview: textPrefix(el, 100).trim()
+          });
+        }
+      }
+
+      return state;
+    },
+
+    /** Session cards on the picker. */
+    listSessions() {
+      return Array.from(document.querySelectorAll('.session-card')).map(el => ({
+        id: el.dataset.id,
+        name: el.querySelector('.name')?.textContent,
+        preview: el.querySelector('.preview')?.textContent,
+        alive: el.querySelector('.status-dot')?.classList.contains('alive')
+      }));
+    },
+
+    // Lookups by id. Ids are passed as data and CSS-escaped here, so callers
+    // never splice them into selector strings.
+
+    /** Session card by id, falling back to an id-prefix match. */
+    findCard(id) {
+      const v = CSS.escape(id);
+      return document.querySelector(`.session-card[data-id="${v}"]`)
+        || document.querySelector(`.session-card[data-id^="${v}"]`);
+    },
+
+    /** Inline question card by data-question-id. */
+    findQuestion(id) {
+      return document.querySelector(`.ask-user-question[data-question-id="${CSS.escape(id)}"]`);
+    },
+
+    /** Inline plan card by data-plan-id. */
+    findPlan(id) {
+      return document.querySelector(`.exit-plan-mode[data-plan-id="${CSS.escape(id)}"]`);
+    },
+
+    /** Whether the conversation for a session (id or prefix) has finished loading. */
+    sessionLoaded(id) {
+      const loaded = document.getElementById('messages-container')?.dataset.loadedSession;
+      return !!loaded && loaded.startsWith(id);
+    },
+
+    /** Per-message breakdown for inspect-session.py. */
+    inspectMessages() {
+      const msgs = [];
+      document.querySelectorAll('.message').forEach((el, i) => {
+        const questions = [];
+        el.querySelectorAll('.ask-user-question').forEach(q => {
+          questions.push({
+            id: q.dataset.questionId,
+            answered: q.classList.contains('answered'),
+            loading: q.querySelector('.loading') !== null,
+            header: q.querySelector('.question-header')?.textContent
+          });
+        });
+
+        const plans = [];
+        el.querySelectorAll('.exit-plan-mode').forEach(p => {
+          plans.push({
+            id: p.dataset.planId,
+            answered: p.classList.contains('answered')
+          });
+        });
+
+        msgs.push({
+          idx: i,
+          uuid: el.dataset.uuid,
+          type: el.classList.contains('user') ? 'user' : 'assistant',
+          pending: el.classList.contains('pending'),
+          preview: textPrefix(el, 55).trim().replace(/\s+/g, ' '),
+          questions,
+          plans
+        });
+      });
+      return msgs;
+    }
+  };
+})();
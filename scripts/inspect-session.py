@@ -6,133 +6,134 @@ Usage:
     python scripts/inspect-session.py <session-id>
     python scripts/inspect-session.py <session-id> --screenshot
     python scripts/inspect-session.py --list
+    python scripts/inspect-session.py --all        # Inspect every session in parallel tabs
+    python scripts/inspect-session.py --list --cdp-endpoint <ws-url>   # Reuse serve-browser.py
 """
 import sys
 import json
+import asyncio
+import argparse
 from playwright.sync_api import sync_playwright
-
-BASE_URL = "http://127.0.0.1:7682"
-
-def list_sessions():
+from playwright.async_api import async_playwright
+from _browser import open_page, close_page, open_context_async, install_getters, GETTERS_JS
+from _sessions import (JS_LIST_SESSIONS, JS_INSPECT_MESSAGES,
+                       goto_sessions, goto_sessions_async, open_session, open_session_async,
+                       list_sessions as session_cards)
+
+def print_messages(session_id, messages):
+    print(f"\n{'='*60}")
+    print(f"Session: {session_id}")
+    print(f"Messages: {len(messages)}")
+    print(f"{'='*60}\n")
+
+    for m in messages:
+        prefix = "👤" if m['type'] == 'user' else "🤖"
+        flags = []
+        if m['pending']:
+            flags.append('PENDING')
+
+        extra = ""
+        if m['questions']:
+            for q in m['questions']:
+                state = "✓" if q['answered'] else ("⏳" if q['loading'] else "?")
+                extra += f"\n     └─ Q: {q['header']} [{state}]"
+        if m['plans']:
+            for p in m['plans']:
+                state = "✓" if p['answered'] else "?"
+                extra += f"\n     └─ Plan [{state}]"
+
+        flag_str = f" [{', '.join(flags)}]" if flags else ""
+        print(f"{m['idx']:2d} {prefix} {m['preview']}{flag_str}{extra}")
+
+def list_sessions(cdp_endpoint=None):
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(BASE_URL)
-        page.wait_for_load_state('networkidle')
-        page.wait_for_timeout(500)
-
-        sessions = page.evaluate('''() => {
-            return Array.from(document.querySelectorAll('.session-card')).map(el => ({
-                id: el.dataset.id,
-                name: el.querySelector('.name')?.textContent,
-                preview: el.querySelector('.preview')?.textContent,
-                alive: el.querySelector('.status-dot')?.classList.contains('alive')
-            }));
-        }''')
+        browser, page = open_page(p, cdp_endpoint)
+        install_getters(page)
+        goto_sessions(page)
+
+        sessions = session_cards(page)
 
         print(f"Found {len(sessions)} sessions:")
         for s in sessions:
             status = "🟢" if s['alive'] else "⚪"
             print(f"  {status} {s['id'][:8]}... - {s['name']} ({s['preview']})")
 
-        browser.close()
+        close_page(browser, page)
 
-def inspect_session(session_id, screenshot=False):
+def inspect_session(session_id, screenshot=False, cdp_endpoint=None):
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(BASE_URL)
-        page.wait_for_load_state('networkidle')
-        page.wait_for_timeout(500)
-
-        # Click into session
-        card = page.locator(f'.session-card[data-id="{session_id}"]')
-        if card.count() == 0:
-            # Try partial match
-            card = page.locator(f'.session-card[data-id^="{session_id}"]')
-
-        if card.count() == 0:
+        browser, page = open_page(p, cdp_endpoint)
+        install_getters(page)
+        goto_sessions(page)
+
+        if not open_session(page, session_id):
             print(f"Session not found: {session_id}")
-            browser.close()
+            close_page(browser, page)
             return
 
-        card.click()
-        page.wait_for_timeout(1500)
-
         if screenshot:
             path = f"/tmp/claude-go-{session_id[:8]}.png"
             page.screenshot(path=path, full_page=True)
             print(f"Screenshot: {path}")
 
         # Extract DOM state
-        messages = page.evaluate('''() => {
-            const msgs = [];
-            document.querySelectorAll('.message').forEach((el, i) => {
-                const questions = [];
-                el.querySelectorAll('.ask-user-question').forEach(q => {
-                    questions.push({
-                        id: q.dataset.questionId,
-                        answered: q.classList.contains('answered'),
-                        loading: q.querySelector('.loading') !== null,
-                        header: q.querySelector('.question-header')?.textContent
-                    });
-                });
-
-                const plans = [];
-                el.querySelectorAll('.exit-plan-mode').forEach(p => {
-                    plans.push({
-                        id: p.dataset.planId,
-                        answered: p.classList.contains('answered')
-                    });
-                });
-
-                msgs.push({
-                    idx: i,
-                    uuid: el.dataset.uuid,
-                    type: el.classList.contains('user') ? 'user' : 'assistant',
-                    pending: el.classList.contains('pending'),
-                    preview: el.textContent?.substring(0, 80).trim().replace(/\\s+/g, ' '),
-                    questions,
-                    plans
-                });
-            });
-            return msgs;
-        }''')
-
-        print(f"\n{'='*60}")
-        print(f"Session: {session_id}")
-        print(f"Messages: {len(messages)}")
-        print(f"{'='*60}\n")
-
-        for m in messages:
-            prefix = "👤" if m['type'] == 'user' else "🤖"
-            flags = []
-            if m['pending']:
-                flags.append('PENDING')
-
-            extra = ""
-            if m['questions']:
-                for q in m['questions']:
-                    state = "✓" if q['answered'] else ("⏳" if q['loading'] else "?")
-                    extra += f"\n     └─ Q: {q['header']} [{state}]"
-            if m['plans']:
-                for p in m['plans']:
-                    state = "✓" if p['answered'] else "?"
-                    extra += f"\n     └─ Plan [{state}]"
-
-            flag_str = f" [{', '.join(flags)}]" if flags else ""
-            print(f"{m['idx']:2d} {prefix} {m['preview'][:55]}{flag_str}{extra}")
-
-        browser.close()
+        messages = page.evaluate(JS_INSPECT_MESSAGES)
+        print_messages(session_id, messages)
+
+        close_page(browser, page)
+
+async def _inspect_one(context, session_id):
+    """Open one session in its own tab and extract its messages (None if it has no card)."""
+    page = await context.new_page()
+    try:
+        await goto_sessions_async(page)
+        if not await open_session_async(page, session_id):
+            return None
+        return await page.evaluate(JS_INSPECT_MESSAGES)
+    finally:
+        await page.close()
+
+async def inspect_all(cdp_endpoint=None):
+    """Inspect every session concurrently, one tab per session."""
+    async with async_playwright() as p:
+        browser, context = await open_context_async(p, cdp_endpoint)
+        await context.add_init_script(script=GETTERS_JS)
+
+        page = await context.new_page()
+        await goto_sessions_async(page)
+        sessions = await page.evaluate(JS_LIST_SESSIONS)
+        await page.close()
+
+        ids = [s['id'] for s in sessions]
+        # One session failing to load shouldn't cost the rest of the run
+        results = await asyncio.gather(*[_inspect_one(context, sid) for sid in ids],
+                                       return_exceptions=True)
+
+        for sid, messages in zip(ids, results):
+            if messages is None:
+                print(f"Session not found: {sid}")
+            elif isinstance(messages, Exception):
+                print(f"Skipping {sid}: {messages}")
+            else:
+                print_messages(sid, messages)
+
+        await browser.close()
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(usage=__doc__)
+    parser.add_argument('session_id', nargs='?')
+    parser.add_argument('--list', action='store_true')
+    parser.add_argument('--all', action='store_true')
+    parser.add_argument('--screenshot', action='store_true')
+    parser.add_argument('--cdp-endpoint', help='Attach to a running browser instead of launching one')
+    args = parser.parse_args()
+
+    if args.list:
+        list_sessions(args.cdp_endpoint)
+    elif args.all:
+        asyncio.run(inspect_all(args.cdp_endpoint))
+    elif args.session_id:
+        inspect_session(args.session_id, args.screenshot, args.cdp_endpoint)
+    else:
         print(__doc__)
         sys.exit(1)
-
-    if sys.argv[1] == "--list":
-        list_sessions()
-    else:
-        session_id = sys.argv[1]
-        screenshot = "--screenshot" in sys.argv
-        inspect_session(session_id, screenshot)
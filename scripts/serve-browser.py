@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Keep one headless Chromium running for the Claude Go scripts.
+
+Advertises its CDP endpoint in /tmp/claude-go-browser.endpoint, which the
+other scripts check before launching their own browser (or pass it
+explicitly with --cdp-endpoint). Shuts down after sitting idle.
+
+Usage:
+    python scripts/serve-browser.py
+    python scripts/serve-browser.py --port 9333
+    python scripts/serve-browser.py --idle-timeout 0   # Never time out
+"""
+import time
+import argparse
+import requests
+from playwright.sync_api import sync_playwright
+from _browser import ENDPOINT_FILE, launch
+
+IDLE_POLL_MS = 10000
+
+
+def client_pages(port):
+    """Pages open besides our own idle one, i.e. scripts currently attached."""
+    targets = requests.get(f"http://127.0.0.1:{port}/json/list").json()
+    return sum(1 for t in targets if t['type'] == 'page') - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Claude Go shared browser')
+    parser.add_argument('--port', type=int, default=9222, help='Remote debugging port')
+    parser.add_argument('--idle-timeout', type=int, default=30,
+                        help='Minutes with no attached scripts before exiting (0 = never)')
+    args = parser.parse_args()
+
+    with sync_playwright() as p:
+        browser = launch(p, [f'--remote-debugging-port={args.port}'])
+        info = requests.get(f"http://127.0.0.1:{args.port}/json/version").json()
+        endpoint = info['webSocketDebuggerUrl']
+        ENDPOINT_FILE.write_text(endpoint)
+        print(f"CDP endpoint: {endpoint} (written to {ENDPOINT_FILE})")
+        print("Ctrl-C to stop")
+
+        # Idle on a page so the driver keeps pumping events while we wait
+        idle = browser.new_page()
+        last_used = time.monotonic()
+        try:
+            while browser.is_connected():
+                idle.wait_for_timeout(IDLE_POLL_MS)
+                if client_pages(args.port) > 0:
+                    last_used = time.monotonic()
+                elif args.idle_timeout and time.monotonic() - last_used > args.idle_timeout * 60:
+                    print(f"Idle for {args.idle_timeout} min, shutting down")
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Only remove the file if it's still ours
+            if ENDPOINT_FILE.exists() and ENDPOINT_FILE.read_text() == endpoint:
+                ENDPOINT_FILE.unlink()
+            browser.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+/**
+ * Page-side state and checks for test-ui.py (window.__testState).
+ *
+ * Installed in every test context via add_init_script, so each probe is a
+ * short `__testState.<name>(...)` call instead of re-shipping the function
+ * source with every evaluate and wait_for_function.
+ *
+ * The message count reads a live HTMLCollection, which the browser keeps
+ * current itself, and a MutationObserver marks the card index stale
+ * whenever the DOM changes, so repeat reads of an unchanged page are a
+ * property access rather than another querySelectorAll over every message.
+ * The same observer reports cards as they become answered to the
+ * __testAnswered binding, if the test exposed one, so Python can wait on a
+ * push instead of polling.
+ */
+(() => {
+  let stale = true, questions = new Map(), plans = new Map();
+  const messages = document.getElementsByClassName('message');
+  const CARD_ANSWERED = '.answered[data-question-id], .answered[data-plan-id]';
+
+  // Cards marked answered in place, or (re-)rendered already answered
+  const reportAnswered = records => {
+    const notify = window.__testAnswered;
+    if (!notify) return;
+    const ids = new Set();
+    for (const r of records) {
+      if (r.type === 'attributes') {
+        if (r.target.matches(CARD_ANSWERED)) ids.add(r.target.dataset.questionId ?? r.target.dataset.planId);
+        continue;
+      }
+      for (const node of r.addedNodes) {
+        if (node.nodeType !== Node.ELEMENT_NODE) continue;
+        if (node.matches(CARD_ANSWERED)) ids.add(node.dataset.questionId ?? node.dataset.planId);
+        for (const el of node.querySelectorAll(CARD_ANSWERED)) ids.add(el.dataset.questionId ?? el.dataset.planId);
+      }
+    }
+    ids.forEach(id => notify(id));
+  };
+
+  const changed = records => {
+    stale = true;
+    reportAnswered(records);
+  };
+  const observer = new MutationObserver(changed);
+
+  const refresh = () => {
+    // Mutations from the current task haven't reached the callback yet
+    const records = observer.takeRecords();
+    if (records.length) changed(records);
+    if (!stale) return;
+    questions = new Map();
+    for (const el of document.getElementsByClassName('ask-user-question')) {
+      questions.set(el.dataset.questionId, el.classList.contains('answered'));
+    }
+    plans = new Map();
+    for (const el of document.getElementsByClassName('exit-plan-mode')) {
+      plans.set(el.dataset.planId, el.classList.contains('answered'));
+    }
+    stale = false;
+  };
+
+  const panel = () => document.getElementById('interaction-panel');
+  const panelVisible = () => !!panel() && !panel().classList.contains('hidden');
+
+  window.__testState = {
+    get messageCount() { return messages.length; },
+
+    /** answered flag for one question or plan card, null if it isn't rendered */
+    answered(id) { refresh(); return questions.get(id) ?? plans.get(id) ?? null; },
+
+    /** Everything the panel/card assertions look at, in one round trip. */
+    snapshot() {
+      const answered = {};
+      const cards = (selector, idKey) => Array.from(document.querySelectorAll(selector), el => {
+        const id = el.dataset[idKey];
+        answered[id] = el.classList.contains('answered');
+        return {id, answered: answered[id], header: el.querySelector('.question-header')?.textContent};
+      });
+      return {
+        panelVisible: panelVisible(),
+        panelOptions: Array.from(panel()?.querySelectorAll('.interaction-option') ?? [],
+          o => ({selected: o.classList.contains('selected')})),
+        sendLabel: document.getElementById('send-btn')?.textContent ?? '',
+        questions: cards('.ask-user-question', 'questionId'),
+        plans: cards('.exit-plan-mode', 'planId'),
+        answered
+      };
+    },
+
+    /** Panel visibility plus id -> answered for just the cards asked about. */
+    checkStates(ids) {
+      return {
+        panelVisible: panelVisible(),
+        answered: Object.fromEntries(ids.map(id => [id, this.answered(id)]))
+      };
+    },
+
+    /** Every question/plan card whose id contains id is answered. */
+    allAnswered(id, kind) {
+      const attr = kind === 'plan' ? 'data-plan-id' : 'data-question-id';
+      const cards = document.querySelectorAll(`[${attr}*="${CSS.escape(id)}"]`);
+      return cards.length > 0 && Array.from(cards).every(el => el.classList.contains('answered'));
+    },
+
+    /**
+     * Click a button and resolve once the exact question/plan card is answered
+     * (false on timeout). The observer is armed before the click, so a
+     * synchronous re-mark is caught too.
+     */
+    clickAndWaitAnswered(selector, id, kind, timeout) {
+      return new Promise(resolve => {
+        const attr = kind === 'plan' ? 'data-plan-id' : 'data-question-id';
+        const card = document.querySelector(`[${attr}="${CSS.escape(id)}"]`);
+        const btn = document.querySelector(selector);
+        if (!card || !btn) return resolve(false);
+
+        const answered = () => card.classList.contains('answered');
+        const finish = result => { observer.disconnect(); clearTimeout(timer); resolve(result); };
+        const observer = new MutationObserver(() => { if (answered()) finish(true); });
+        observer.observe(card, {attributes: true, attributeFilter: ['class']});
+        const timer = setTimeout(() => finish(answered()), timeout);
+        btn.click();
+        if (answered()) finish(true);
+      });
+    },
+
+    /**
+     * Answer [id, optionIndex] pairs from the panel in order (optionIndex is
+     * 0-based; app.js numbers data-index from 1). Panel clicks are handled
+     * synchronously (mark answered, advance, re-render), so the state after
+     * each step can be read straight away.
+     */
+    answerInOrder(answers) {
+      const showing = () => {
+        const i = state.currentInteraction;
+        return i?.type === 'question' ? `q-${i.tool_use_id}-${i.currentIndex}` : null;
+      };
+      return answers.map(([id, index]) => {
+        const shown = showing();
+        const option = shown === id &&
+          panel().querySelector(`.interaction-option[data-index="${CSS.escape(String(index + 1))}"]`);
+        if (option) option.click();
+        const next = showing();
+        return {id, shown, answered: this.answered(id), next,
+                nextAnswered: next && this.answered(next),
+                panelVisible: panelVisible()};
+      });
+    },
+
+    /**
+     * Click session id's card and resolve once its conversation has rendered
+     * (app.js stamps #messages-container), or false if there is no such card
+     * or it doesn't load within timeout.
+     */
+    openSession(id, timeout) {
+      return new Promise(resolve => {
+        const card = document.querySelector(`.session-card[data-id="${CSS.escape(id)}"]`);
+        const container = document.getElementById('messages-container');
+        if (!card || !container) return resolve(false);
+
+        const loaded = () => container.dataset.loadedSession === id;
+        const finish = result => { observer.disconnect(); clearTimeout(timer); resolve(result); };
+        const observer = new MutationObserver(() => { if (loaded()) finish(true); });
+        observer.observe(container, {attributes: true, attributeFilter: ['data-loaded-session']});
+        const timer = setTimeout(() => finish(loaded()), timeout);
+        card.click();
+      });
+    },
+
+    /** Every id is in the app's pending permission queue. */
+    permissionsPending(ids) {
+      return ids.every(id => state.pendingPermissions.has(id));
+    },
+
+    /** The app has dropped the permission locally (after /hook/respond returns). */
+    permissionSettled(id) {
+      return !state.pendingPermissions.has(id) && !state.respondingPermissions.has(id);
+    }
+  };
+
+  const observe = () => observer.observe(document.body, {
+    subtree: true, childList: true, attributes: true, attributeFilter: ['class']
+  });
+  // Init scripts run before <body> exists
+  if (document.body) observe();
+  else document.addEventListener('DOMContentLoaded', observe);
+})();
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Rerun test-ui.py against one long-lived Playwright driver and browser.
+
+Skips the driver and Chromium startup on every run after the first.
+test-ui.py is re-read each time, so edits to the tests are picked up.
+
+Usage:
+    python scripts/test-ui-loop.py                      # Enter to rerun, q to quit
+    python scripts/test-ui-loop.py --test multi-question
+    python scripts/test-ui-loop.py --cdp-endpoint <ws-url>
+"""
+import sys
+import asyncio
+import importlib.util
+from pathlib import Path
+from playwright.async_api import async_playwright
+from _browser import open_browser_async
+
+TEST_UI = Path(__file__).with_name('test-ui.py')
+
+
+def load_test_ui():
+    spec = importlib.util.spec_from_file_location('test_ui', TEST_UI)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def cdp_endpoint(argv):
+    """--cdp-endpoint value from test-ui.py's args, if given."""
+    for i, arg in enumerate(argv):
+        if arg == '--cdp-endpoint' and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith('--cdp-endpoint='):
+            return arg.split('=', 1)[1]
+    return None
+
+
+async def main():
+    argv = sys.argv[1:]
+    # Every run shares this loop (and so the browser), rather than asyncio.run-ing test-ui.py's main
+    async with async_playwright() as p:
+        test_ui = load_test_ui()
+        browser = await open_browser_async(p, cdp_endpoint(argv), test_ui.TEST_LAUNCH_ARGS)
+        try:
+            while True:
+                try:
+                    await test_ui.main(p, browser, argv)
+                except SystemExit:
+                    # argparse error or --help; nothing to rerun
+                    return
+                except Exception as e:
+                    print(f"❌ Run failed: {e}")
+
+                answer = await asyncio.to_thread(input, "\n⏎ rerun, q to quit: ")
+                if answer.strip().lower() == 'q':
+                    return
+                # Pick up edits to the tests for the next run
+                try:
+                    test_ui = load_test_ui()
+                except Exception as e:
+                    print(f"❌ Couldn't reload test-ui.py, rerunning the last copy: {e}")
+        except (KeyboardInterrupt, EOFError):
+            print()
+        finally:
+            await browser.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print()
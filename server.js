@@ -150,12 +150,8 @@ app.delete('/api/sessions/:id', async (req, res) => {
  */
 app.get('/api/sessions/:id/terminal', async (req, res) => {
   try {
-    const { execSync } = require('child_process');
-    const sessionName = `claude-${req.params.id}`;
-    const output = execSync(`tmux capture-pane -t "${sessionName}" -p`, {
-      encoding: 'utf-8',
-      timeout: 5000
-    });
+    // Async so a slow tmux doesn't stall every other request and socket
+    const output = await require('./lib/sessions').capturePane(req.params.id);
     res.type('text/plain').send(output);
   } catch (err) {
     console.error('Error capturing terminal:', err);
@@ -323,7 +319,8 @@ app.get('/hook/pending', (req, res) => {
 if (process.env.NODE_ENV !== 'production') {
   /**
    * POST /dev/inject/:sessionId
-   * Inject mock WebSocket messages for testing without real Claude sessions
+   * Inject mock WebSocket messages for testing without real Claude sessions.
+   * Body is one message, or an array of messages sent in order.
    */
   app.post('/dev/inject/:sessionId', (req, res) => {
     const { sessionId } = req.params;
@@ -333,25 +330,23 @@ if (process.env.NODE_ENV !== 'production') {
       return res.status(404).json({ error: 'No clients connected to this session' });
     }
 
-    // For permission_request, also add to server-side pendingPermissions store
-    // This allows /hook/pending to return injected permissions for testing
-    if (req.body.type === 'permission_request' && req.body.data) {
-      const permission = req.body.data;
-      pendingPermissions.set(permission.tool_use_id, permission);
-      console.log(`[dev] Added permission to server store: ${permission.tool_use_id}`);
-    }
-
-    const message = JSON.stringify(req.body);
-    let sent = 0;
-    clients.forEach(client => {
-      if (client.readyState === WebSocket.OPEN) {
-        client.send(message);
-        sent++;
+    const batch = Array.isArray(req.body) ? req.body : [req.body];
+    const open = [...clients].filter(client => client.readyState === WebSocket.OPEN);
+    for (const body of batch) {
+      // For permission_request, also add to server-side pendingPermissions store
+      // This allows /hook/pending to return injected permissions for testing
+      if (body.type === 'permission_request' && body.data) {
+        const permission = body.data;
+        pendingPermissions.set(permission.tool_use_id, permission);
+        console.log(`[dev] Added permission to server store: ${permission.tool_use_id}`);
       }
-    });
 
-    console.log(`[dev] Injected message to ${sent} client(s) for session ${sessionId}`);
-    res.json({ ok: true, clientCount: sent });
+      const message = JSON.stringify(body);
+      open.forEach(client => client.send(message));
+    }
+
+    console.log(`[dev] Injected ${batch.length} message(s) to ${open.length} client(s) for session ${sessionId}`);
+    res.json({ ok: true, clientCount: open.length, injected: batch.length });
   });
 
   /**
@@ -368,6 +363,83 @@ if (process.env.NODE_ENV !== 'production') {
       res.status(500).json({ error: err.message });
     }
   });
+
+  /**
+   * GET /dev/sessions/first-alive[?prefer=<id>]
+   * The session a test run should use, as {id}: `prefer` if it is still
+   * listed, else the first alive one (or any). 204 when there are none.
+   */
+  app.get('/dev/sessions/first-alive', async (req, res) => {
+    try {
+      const sessions = await require('./lib/sessions').listSessions();
+      const alive = sessions.filter(s => s.alive);
+      const candidates = alive.length > 0 ? alive : sessions;
+      const match = candidates.find(s => s.id === req.query.prefer) || candidates[0];
+      if (!match) return res.status(204).end();
+      res.json({ id: match.id });
+    } catch (err) {
+      res.status(500).json({ error: err.message });
+    }
+  });
+
+  /**
+   * GET /dev/state/:sessionId
+   * Interaction state as the server sees it: questions and plans from the
+   * transcript (answered once a tool_result exists), pending permissions, and
+   * what the panel should be showing, using the app's priority
+   * (permissions > first unanswered question/plan). Messages injected via
+   * /dev/inject only ever exist in the browser, so they are not included.
+   */
+  app.get('/dev/state/:sessionId', async (req, res) => {
+    const { sessionId } = req.params;
+    try {
+      const metadata = sessionMetadata.get(sessionId);
+      const messages = await require('./lib/jsonl').readSession(sessionId, metadata?.cwd);
+
+      const answered = new Set();
+      for (const msg of messages) {
+        if (!Array.isArray(msg.content)) continue;
+        for (const block of msg.content) {
+          if (block.type === 'tool_result') answered.add(block.tool_use_id);
+        }
+      }
+
+      const questions = [];
+      const plans = [];
+      let panel = null;
+      for (const msg of messages) {
+        if (msg.type !== 'assistant' || !Array.isArray(msg.content)) continue;
+        for (const block of msg.content) {
+          if (block.type !== 'tool_use') continue;
+          const isAnswered = answered.has(block.id);
+          if (block.name === 'AskUserQuestion' && block.input?.questions) {
+            block.input.questions.forEach((q, i) => {
+              questions.push({ id: `q-${block.id}-${i}`, answered: isAnswered, header: q.header });
+            });
+            if (!isAnswered && !panel) panel = { kind: 'question', currentId: block.id };
+          } else if (block.name === 'ExitPlanMode') {
+            plans.push({ id: `plan-${block.id}`, answered: isAnswered });
+            if (!isAnswered && !panel) panel = { kind: 'plan', currentId: block.id };
+          }
+        }
+      }
+
+      const permissions = Array.from(pendingPermissions.values())
+        .filter(p => p.session_id === sessionId);
+      if (permissions.length > 0) {
+        panel = { kind: 'permission', currentId: permissions[0].tool_use_id };
+      }
+
+      res.json({
+        questions,
+        plans,
+        permissions,
+        panel: { visible: !!panel, kind: panel?.kind || null, currentId: panel?.currentId || null }
+      });
+    } catch (err) {
+      res.status(500).json({ error: err.message });
+    }
+  });
 }
 
 // =============================================================================
@@ -375,12 +447,15 @@ if (process.env.NODE_ENV !== 'production') {
 // =============================================================================
 
 wss.on('connection', (ws, req) => {
-  // Extract session ID from URL: /ws/:sessionId
-  const urlParts = req.url.split('/');
+  // Extract session ID from URL: /ws/:sessionId[?observer=1]
+  const url = new URL(req.url, 'http://localhost');
+  const urlParts = url.pathname.split('/');
   const sessionId = urlParts[urlParts.length - 1];
   const deviceId = req.headers['x-device-id'] || `device-${Date.now()}`;
+  // Observers (test scripts) get the event feed without taking the device lease
+  const observer = url.searchParams.has('observer');
 
-  console.log(`WebSocket connected: session=${sessionId}, device=${deviceId}`);
+  console.log(`WebSocket connected: session=${sessionId}, device=${deviceId}${observer ? ' (observer)' : ''}`);
 
   // Track this client
   if (!sessionClients.has(sessionId)) {
@@ -390,7 +465,7 @@ wss.on('connection', (ws, req) => {
 
   // Handle device lease (for collision detection)
   const existingLease = deviceLeases.get(sessionId);
-  if (existingLease && existingLease.deviceId !== deviceId) {
+  if (!observer && existingLease && existingLease.deviceId !== deviceId) {
     // Notify the old device that session was taken
     const oldClients = sessionClients.get(sessionId);
     oldClients?.forEach(client => {
@@ -404,10 +479,12 @@ wss.on('connection', (ws, req) => {
   }
 
   // Update lease
-  deviceLeases.set(sessionId, {
-    deviceId,
-    lastHeartbeat: Date.now()
-  });
+  if (!observer) {
+    deviceLeases.set(sessionId, {
+      deviceId,
+      lastHeartbeat: Date.now()
+    });
+  }
 
   // Start watching the JSONL file for this session
   const jsonl = require('./lib/jsonl');